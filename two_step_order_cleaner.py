@@ -40,109 +40,179 @@ Usage (local):
     streamlit run two_step_order_cleaner.py
 """
 
+import codecs
+import datetime as dt
 import io
+import numbers
 import re
+import zipfile
 from pathlib import Path
-from typing import Dict, Set, Tuple
+from typing import Dict, Optional, Set, Tuple
+from xml.sax.saxutils import escape
 
+import numpy as np
+import openpyxl
 import pandas as pd
+import python_calamine
 import streamlit as st
+from openpyxl.utils import get_column_letter
+from openpyxl.writer.excel import ExcelWriter
 
 
 # ---------------------------------------------------------------------------
 # Core transformation
 # ---------------------------------------------------------------------------
 
+# "#003#" token in the address row -> shop_code "003"
+_SHOP_CODE_RE = re.compile(r"#(\d+)#")
+
+# Data rows start at row index 3 (after nickname, address and label rows)
+_DATA_START = 3
+
+# CSV orders: everything as text, only empty fields are NA
+_CSV_READ_OPTS = dict(header=None, dtype=object, keep_default_na=False, na_values=[""])
+
+# Template columns used by the logic; anything else (notes_optional, ...) is
+# never read.
+_TEMPLATE_COLUMNS = frozenset({"shop_code", "shop_nickname_optional"})
+
+
 def load_template_from_file(template_path: Path) -> Tuple[Set[str], Set[str]]:
     """Load client removal template from a local Excel file."""
     if not template_path.exists():
         raise FileNotFoundError(f"Template not found at {template_path}")
 
-    tpl = pd.read_excel(
-        template_path,
-        sheet_name="clients_to_clear",
-        dtype=str
-    ).fillna("")
-
-    if "shop_code" not in tpl.columns:
-        raise ValueError("Template must contain a column named 'shop_code'.")
-
-    if "shop_nickname_optional" not in tpl.columns:
-        tpl["shop_nickname_optional"] = ""
-
-    tpl["shop_code"] = (
-        tpl["shop_code"]
-        .astype(str)
-        .str.replace(r"\\.0$", "", regex=True)
-        .str.strip()
+    # mtime is part of the cache key so edits to the template are picked up
+    return _load_template_file_cached(
+        str(template_path), template_path.stat().st_mtime
     )
-    tpl["shop_nickname_optional"] = tpl["shop_nickname_optional"].astype(str).str.strip()
 
-    shop_codes = set(tpl["shop_code"][tpl["shop_code"] != ""].tolist())
-    nicknames = set(
-        tpl["shop_nickname_optional"][tpl["shop_nickname_optional"] != ""].tolist()
-    )
 
-    return shop_codes, nicknames
+@st.cache_data(show_spinner=False)
+def _load_template_file_cached(
+    template_path: str, mtime: float
+) -> Tuple[Set[str], Set[str]]:
+    """Parse the template at template_path; cached across Streamlit reruns."""
+    return _parse_template(template_path)
 
 
+@st.cache_data(show_spinner=False)
 def load_template_from_bytes(file_bytes: bytes) -> Tuple[Set[str], Set[str]]:
     """Load client removal template from an uploaded Excel file (Streamlit)."""
+    return _parse_template(io.BytesIO(file_bytes))
+
+
+def _parse_template(src) -> Tuple[Set[str], Set[str]]:
+    """Read shop codes and nicknames from a template path or file-like object."""
     tpl = pd.read_excel(
-        io.BytesIO(file_bytes),
+        src,
         sheet_name="clients_to_clear",
-        dtype=str
+        usecols=lambda c: c in _TEMPLATE_COLUMNS,
+        dtype=str,
+        engine="calamine",
     ).fillna("")
 
     if "shop_code" not in tpl.columns:
         raise ValueError("Template must contain a column named 'shop_code'.")
 
-    if "shop_nickname_optional" not in tpl.columns:
-        tpl["shop_nickname_optional"] = ""
-
-    tpl["shop_code"] = (
-        tpl["shop_code"]
-        .astype(str)
-        .str.replace(r"\\.0$", "", regex=True)
-        .str.strip()
-    )
-    tpl["shop_nickname_optional"] = tpl["shop_nickname_optional"].astype(str).str.strip()
+    codes = tpl["shop_code"].to_numpy(dtype=object)
+    shop_codes = {s for s in (str(x).strip().removesuffix(".0") for x in codes) if s}
 
-    shop_codes = set(tpl["shop_code"][tpl["shop_code"] != ""].tolist())
-    nicknames = set(
-        tpl["shop_nickname_optional"][tpl["shop_nickname_optional"] != ""].tolist()
-    )
+    nicknames: Set[str] = set()
+    if "shop_nickname_optional" in tpl.columns:
+        nicks = tpl["shop_nickname_optional"].to_numpy(dtype=object)
+        nicknames = {s for s in (str(x).strip() for x in nicks) if s}
 
     return shop_codes, nicknames
 
 
+def _cell_str(value) -> str:
+    """Header cell as text: empty for blanks, 3.0 -> "3" like pandas reads it."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _excel_value(value):
+    """
+    Calamine cell as pd.read_excel would give it: 3.0 -> 3, date -> datetime,
+    blank -> None. Text such as "NA" is kept as-is.
+    """
+    if value == "":
+        return None
+    if type(value) is float and value.is_integer():
+        return int(value)
+    if type(value) is dt.date:
+        return dt.datetime(value.year, value.month, value.day)
+    return value
+
+
 def find_col(hdr_series: pd.Series, name_exact: str):
     """Find first column index in hdr_series where stripped value == name_exact."""
-    for i, v in enumerate(hdr_series):
-        if str(v).strip() == name_exact:
-            return i
-    return None
+    arr = np.char.strip(hdr_series.to_numpy(dtype=str))
+    idx = np.flatnonzero(arr == name_exact)
+    return int(idx[0]) if idx.size else None
 
 
-def transform_order(
+def _csv_encoding(order_bytes: bytes) -> str:
+    """Encoding of a CSV order; a UTF-8 BOM is kept on the way out."""
+    return "utf-8-sig" if order_bytes.startswith(codecs.BOM_UTF8) else "utf-8"
+
+
+def _read_csv_order(order_bytes: bytes, **kwargs) -> pd.DataFrame:
+    """
+    pd.read_csv for a CSV order. The column count comes from the first row,
+    so a later row with more fields is reported as a clear ValueError.
+    """
+    try:
+        return pd.read_csv(
+            io.BytesIO(order_bytes),
+            encoding=_csv_encoding(order_bytes),
+            **_CSV_READ_OPTS,
+            **kwargs,
+        )
+    except pd.errors.ParserError as e:
+        raise ValueError(
+            "Ragged CSV: some rows have more fields than the first (header) row "
+            f"({str(e).strip()}). Re-export the order so every row has the same number of "
+            "columns, or upload it as Excel."
+        ) from e
+
+
+def read_order_header(
     order_bytes: bytes,
-    shop_codes_to_clear: Set[str],
-    nicknames_to_clear: Set[str],
-    protected_supplier: str = "გაგრა პლუსი",
     west_prefix: str = "დასავლეთი",
-) -> Tuple[bytes, Dict]:
-    """
-    Apply business rules to the order workbook and return:
-        (modified_workbook_bytes, summary_dict)
+    fmt: str = "xlsx",
+) -> Dict:
     """
+    Read only the top rows of the order's first sheet and analyse the header.
 
-    xls = pd.ExcelFile(io.BytesIO(order_bytes))
-    sheet_name = xls.sheet_names[0]
-    raw = xls.parse(sheet_name, header=None, dtype=object)
+    Returns a dict with sheet_name, head_rows, nicknames (stripped row 0),
+    shop_codes (#ID# token of row 1, "" if none), col_supplier, west_cols and
+    sheet (the open calamine sheet, None for CSV) for read_order to reuse.
+    """
+    # The first sheet name is kept so the output workbook mirrors the input.
+    # Calamine loads the sheet range here; only the top rows are converted
+    # to Python objects.
+    if fmt == "csv":
+        sheet = None
+        sheet_name = None
+        head_rows = (
+            _read_csv_order(order_bytes, nrows=10)
+            .fillna("")
+            .to_numpy()
+            .tolist()
+        )
+    else:
+        sheet = python_calamine.CalamineWorkbook.from_filelike(
+            io.BytesIO(order_bytes)
+        ).get_sheet_by_index(0)
+        sheet_name = sheet.name
+        head_rows = sheet.to_python(skip_empty_area=False, nrows=10)
 
     # Header rows
-    hdr_nickname = raw.iloc[0].astype(str).fillna("")  # row 0
-    hdr_address = raw.iloc[1].astype(str).fillna("")   # row 1
+    hdr_nickname = pd.Series([_cell_str(v) for v in head_rows[0]])  # row 0
+    hdr_address = pd.Series([_cell_str(v) for v in head_rows[1]])   # row 1
 
     # Supplier column
     col_supplier = find_col(hdr_nickname, "ძირითადი მომწოდებელი")
@@ -151,58 +221,170 @@ def transform_order(
             "Could not find supplier column 'ძირითადი მომწოდებელი' in the first row."
         )
 
-    # Map shop columns by shop_code from address row (#123#)
-    shop_cols_map: Dict[int, str] = {}
-    for i, meta in enumerate(hdr_address):
-        m = re.search(r"#(\\d+)#", str(meta))
-        if m:
-            shop_cols_map[i] = m.group(1)
+    # Header rows as arrays: stripped nicknames and shop codes from the
+    # address row's #123# token ("" where there is none)
+    nick_arr = np.char.strip(hdr_nickname.to_numpy(dtype=str))
+    code_arr = np.array(
+        [m.group(1) if m else "" for m in map(_SHOP_CODE_RE.search, hdr_address)],
+        dtype=str,
+    )
 
-    columns_to_clear = set()
+    # Detect "West" columns
+    west_cols = np.flatnonzero(np.char.startswith(nick_arr, west_prefix)).tolist()
 
-    # Match by shop_code
-    for col_idx, code in shop_cols_map.items():
-        if code in shop_codes_to_clear:
-            columns_to_clear.add(col_idx)
+    return {
+        "sheet_name": sheet_name,
+        "head_rows": head_rows,
+        "nicknames": nick_arr,
+        "shop_codes": code_arr,
+        "col_supplier": col_supplier,
+        "west_cols": west_cols,
+        "sheet": sheet,
+    }
 
-    # Match by nickname
-    for col_idx, nickname in enumerate(hdr_nickname):
-        if nickname.strip() in nicknames_to_clear:
-            columns_to_clear.add(col_idx)
 
-    # Detect "West" columns
-    west_cols = [
-        i
-        for i, v in enumerate(hdr_nickname)
-        if str(v).strip().startswith(west_prefix)
-    ]
+def read_order(
+    order_bytes: bytes,
+    west_prefix: str = "დასავლეთი",
+    fmt: str = "xlsx",
+    header: Optional[Dict] = None,
+) -> Dict:
+    """
+    Parse the order's first sheet without its "West" columns.
+
+    Extends read_order_header's dict (or the given header) with:
+        keep_cols - original positions of the kept (non-"West") columns
+        raw       - data frame of the kept columns, positional labels
+        suppliers - supplier column values of the data rows
+    """
+    if header is None:
+        header = read_order_header(order_bytes, west_prefix, fmt)
+    col_supplier = header["col_supplier"]
+
+    # "West" columns are left out of the frame. For Excel the already loaded
+    # sheet is converted to Python rows once and only the kept cells go into
+    # the frame. The supplier column is always kept since the row mask
+    # depends on it.
+    west_set = set(header["west_cols"])
+    keep_cols = [i for i in range(len(header["head_rows"][0])) if i not in west_set]
+    read_cols = sorted(set(keep_cols) | {col_supplier})
+    if fmt == "csv":
+        # No usecols: with it the C parser silently drops extra fields of
+        # ragged rows instead of raising
+        raw = _read_csv_order(order_bytes)[read_cols]
+    else:
+        rows = header["sheet"].to_python(skip_empty_area=False)
+        raw = pd.DataFrame(
+            [[_excel_value(row[i]) for i in read_cols] for row in rows],
+            columns=read_cols,
+            dtype=object,
+        )
 
-    out = raw.copy()
+    suppliers = raw[col_supplier].to_numpy(dtype=object)[_DATA_START:]
+    if col_supplier in west_set:
+        raw = raw[keep_cols]
+    raw.columns = range(raw.shape[1])
 
-    # Data rows start at index 3
-    data_start = 3
+    return {**header, "keep_cols": keep_cols, "raw": raw, "suppliers": suppliers}
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def transform_order(
+    order_bytes: bytes,
+    shop_codes_to_clear: Set[str],
+    nicknames_to_clear: Set[str],
+    protected_supplier: str = "გაგრა პლუსი",
+    west_prefix: str = "დასავლეთი",
+    fast_writer: bool = False,
+    fmt: str = "xlsx",
+) -> Tuple[bytes, Dict]:
+    """
+    Apply business rules to the order workbook and return:
+        (modified_workbook_bytes, summary_dict)
 
-    suppliers = out.iloc[data_start:, col_supplier].astype(str).fillna("")
-    mask_not_protected = suppliers.str.strip() != protected_supplier
-    rows_to_edit = suppliers.index[mask_not_protected]
+    summary_dict["preview_df"] holds the top 10 cleaned rows for display.
 
-    cleared_cells = 0
-    for c in columns_to_clear:
-        col_slice = out.loc[rows_to_edit, c]
-        cleared_cells += int(col_slice.notna().sum())
-        out.loc[rows_to_edit, c] = ""
+    fast_writer=True emits the XLSX directly (write_xlsx_fast) instead of
+    going through openpyxl.
 
-    if west_cols:
-        out = out.drop(columns=west_cols)
+    fmt="csv" treats order_bytes as a CSV export of the same sheet and
+    returns CSV bytes (same encoding, BOM kept); no XLSX is involved.
+    """
 
+    # Read only the top rows first: the header rows decide which columns are
+    # cleared or dropped, and the no-op case never converts the full sheet
+    # to Python rows.
+    order = read_order_header(order_bytes, west_prefix, fmt)
+    sheet_name = order["sheet_name"]
+    west_cols = order["west_cols"]
+
+    # Match by shop_code OR nickname
+    code_hits = np.isin(order["shop_codes"], list(shop_codes_to_clear))
+    nick_hits = np.isin(order["nicknames"], list(nicknames_to_clear))
+    cols_by_code = np.flatnonzero(code_hits)
+    cols_by_nick = np.flatnonzero(nick_hits)
+    columns_to_clear = set(cols_by_code.tolist()) | set(cols_by_nick.tolist())
+
+    # Nothing to clear and nothing to drop: the cleaned sheet would equal the
+    # input, so return the original file as-is. Only for CSV and XLSX (zip)
+    # input, so an Excel download is always a real .xlsx file.
+    is_passthrough_fmt = fmt == "csv" or order_bytes[:2] == b"PK"
+    if not columns_to_clear and not west_cols and is_passthrough_fmt:
+        summary = {
+            "sheet_name": sheet_name,
+            "columns_to_clear_count": 0,
+            "west_columns_dropped": 0,
+            "rows_eligible_by_supplier_rule": 0,
+            "cleared_cells_estimate": 0,
+            "protected_supplier": protected_supplier,
+            # Same cell conversion as read_order: 3.0 -> 3, blank -> None
+            # (CSV head rows only hold text and "" for blanks)
+            "preview_df": pd.DataFrame(
+                [[_excel_value(v) for v in row] for row in order["head_rows"]],
+                dtype=object,
+            ),
+        }
+        return order_bytes, summary
+
+    order = read_order(order_bytes, west_prefix, fmt, header=order)
+
+    # Dictionary-encode the supplier column (few distinct values): strip and
+    # compare each distinct supplier once, then map back by integer code
+    sup_codes, sup_uniques = pd.factorize(order["suppliers"], use_na_sentinel=False)
+    sup_names = np.char.strip(np.asarray(sup_uniques).astype(str))
+    is_protected = sup_names == protected_supplier
+    mask_not_protected = ~is_protected[sup_codes]
+
+    # Remap the columns to clear onto the positions of the projected frame.
+    # raw is a private frame from read_order (header rows above are already
+    # materialized), so it is mutated in place instead of copied.
+    pos_map = {old: new for new, old in enumerate(order["keep_cols"])}
+    columns_to_clear = {pos_map[c] for c in columns_to_clear if c in pos_map}
+    out = order["raw"]
+
+    # Clear the (eligible rows x matched columns) block in one positional assign
+    row_pos = np.flatnonzero(mask_not_protected) + _DATA_START
+    cols_arr = np.fromiter(sorted(columns_to_clear), dtype=np.int64)
+
+    block = out.iloc[row_pos, cols_arr].to_numpy()
+    cleared_cells = int(pd.notna(block).sum())
+    out.iloc[row_pos, cols_arr] = ""
+
+    # Values-only output (no header row, no index), NaN written as empty cells
     output_buffer = io.BytesIO()
-    with pd.ExcelWriter(output_buffer, engine="xlsxwriter") as writer:
-        out.to_excel(
-            writer,
+    if fmt == "csv":
+        out.to_csv(
+            output_buffer,
             index=False,
             header=False,
-            sheet_name=sheet_name,
+            encoding=_csv_encoding(order_bytes),
         )
+    else:
+        out = out.astype(object).where(out.notna(), None)
+        if fast_writer:
+            write_xlsx_fast(out, sheet_name, output_buffer)
+        else:
+            write_xlsx_openpyxl(out, sheet_name, output_buffer)
     output_buffer.seek(0)
 
     summary = {
@@ -212,11 +394,187 @@ def transform_order(
         "rows_eligible_by_supplier_rule": int(mask_not_protected.sum()),
         "cleared_cells_estimate": cleared_cells,
         "protected_supplier": protected_supplier,
+        "preview_df": out.head(10),
     }
 
     return output_buffer.getvalue(), summary
 
 
+# ---------------------------------------------------------------------------
+# Values-only XLSX writers
+# ---------------------------------------------------------------------------
+
+# zlib level for the XLSX zip container: the file is downloaded and uploaded
+# to the ERP right away, so favour speed over size (default level is 6)
+_XLSX_COMPRESSLEVEL = 1
+
+
+def write_xlsx_openpyxl(out_df: pd.DataFrame, sheet_name: str, buf) -> None:
+    """
+    Write out_df as a single-sheet XLSX into buf via openpyxl's write-only mode.
+
+    Rows are streamed as plain tuples (no DataFrame.to_excel, no per-cell
+    style lookups). No header row and no index are written.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    for row in out_df.itertuples(index=False, name=None):
+        # openpyxl rejects XML-illegal control characters; drop them as the
+        # fast writer does
+        ws.append(
+            [
+                _ILLEGAL_XML_CHARS_RE.sub("", v) if isinstance(v, str) else v
+                for v in row
+            ]
+        )
+
+    # Same as wb.save(buf) / openpyxl's save_workbook, but with our own
+    # archive to set the zlib level. This relies on openpyxl internals
+    # (ExcelWriter and what save_workbook does around it), so re-check on
+    # openpyxl upgrades.
+    wb.properties.modified = dt.datetime.now(tz=dt.timezone.utc).replace(tzinfo=None)
+    archive = zipfile.ZipFile(
+        buf,
+        "w",
+        zipfile.ZIP_DEFLATED,
+        allowZip64=True,
+        compresslevel=_XLSX_COMPRESSLEVEL,
+    )
+    ExcelWriter(wb, archive).save()
+
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Style 0 = default, 1 = date (numFmt 14), 2 = date-time (numFmt 22)
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_SHEET_HEAD_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+
+_SHEET_TAIL_XML = '</sheetData></worksheet>'
+
+# Control characters that are not allowed in XML 1.0
+_ILLEGAL_XML_CHARS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_EXCEL_EPOCH = dt.datetime(1899, 12, 30)
+
+
+def _xlsx_cell(ref: str, value) -> str:
+    """Render one <c> element; returns "" for empty cells."""
+    if value is None or value == "":
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    # Plain int/float text also for NumPy scalars (their repr is np.float64(..))
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        if value != value or value in (float("inf"), float("-inf")):
+            return ""
+        return f'<c r="{ref}"><v>{value!r}</v></c>'
+    if isinstance(value, dt.datetime):
+        serial = (value.replace(tzinfo=None) - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{ref}" s="2"><v>{serial!r}</v></c>'
+    if isinstance(value, dt.date):
+        serial = (dt.datetime.combine(value, dt.time()) - _EXCEL_EPOCH).days
+        return f'<c r="{ref}" s="1"><v>{serial}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS_RE.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def write_xlsx_fast(out_df: pd.DataFrame, sheet_name: str, buf) -> None:
+    """
+    Write out_df as a single-sheet, values-only XLSX into buf.
+
+    Builds the package parts by hand and streams sheet1.xml row by row with
+    inline strings (no shared-strings table, no styles besides dates).
+    No header row and no index are written. Empty/NaN cells are omitted.
+    """
+    col_refs = [get_column_letter(i + 1) for i in range(out_df.shape[1])]
+
+    with zipfile.ZipFile(
+        buf, "w", zipfile.ZIP_DEFLATED, compresslevel=_XLSX_COMPRESSLEVEL
+    ) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES_XML)
+        zf.writestr("_rels/.rels", _ROOT_RELS_XML)
+        zf.writestr(
+            "xl/workbook.xml",
+            _WORKBOOK_XML.format(sheet_name=escape(sheet_name, {'"': "&quot;"})),
+        )
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS_XML)
+        zf.writestr("xl/styles.xml", _STYLES_XML)
+
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(_SHEET_HEAD_XML.encode("utf-8"))
+            for r, row in enumerate(out_df.itertuples(index=False, name=None), 1):
+                cells = "".join(
+                    _xlsx_cell(f"{col_refs[c]}{r}", v) for c, v in enumerate(row)
+                )
+                sheet.write(f'<row r="{r}">{cells}</row>'.encode("utf-8"))
+            sheet.write(_SHEET_TAIL_XML.encode("utf-8"))
+
+
 # ---------------------------------------------------------------------------
 # Streamlit UI
 # ---------------------------------------------------------------------------
@@ -236,8 +594,8 @@ def main():
     st.markdown("### 1. Upload order file")
 
     order_file = st.file_uploader(
-        "Order file (Excel)",
-        type=["xlsx", "xls"],
+        "Order file (Excel or CSV)",
+        type=["xlsx", "xls", "csv"],
         key="order_file",
     )
 
@@ -269,6 +627,10 @@ def main():
         "Prefix for 'West' aggregate columns to drop:",
         value="დასავლეთი",
     )
+    fast_writer = st.checkbox(
+        "Use fast XLSX writer (experimental, values-only output)",
+        value=False,
+    )
 
     st.markdown("---")
     st.markdown("### 4. Run transformation")
@@ -299,12 +661,15 @@ def main():
                 )
                 return
 
+            fmt = "csv" if order_file.name.lower().endswith(".csv") else "xlsx"
             cleaned_bytes, summary = transform_order(
                 order_bytes=order_file.getvalue(),
                 shop_codes_to_clear=shop_codes,
                 nicknames_to_clear=nicknames,
                 protected_supplier=protected_supplier,
                 west_prefix=west_prefix,
+                fast_writer=fast_writer,
+                fmt=fmt,
             )
 
         except Exception as e:
@@ -313,29 +678,51 @@ def main():
 
         st.success("Cleaning completed. Review the summary and download the new file.")
 
+        preview_df = summary.pop("preview_df", None)
+
         st.subheader("Summary")
         st.json(summary)
 
+        if fmt == "csv":
+            file_name = "Ori_Nabiji_შეკვეთა(ასატვირთი).csv"
+            mime = "text/csv"
+        else:
+            file_name = "Ori_Nabiji_შეკვეთა(ასატვირთი).xlsx"
+            mime = (
+                "application/vnd.openxmlformats-officedocument."
+                "spreadsheetml.sheet"
+            )
+
         st.download_button(
             label="Download cleaned order file",
             data=cleaned_bytes,
-            file_name="Ori_Nabiji_შეკვეთა(ასატვირთი).xlsx",
-            mime=(
-                "application/vnd.openxmlformats-officedocument."
-                "spreadsheetml.sheet"
-            ),
+            file_name=file_name,
+            mime=mime,
         )
 
         st.subheader("Preview (top 10 rows after cleaning)")
-        try:
-            preview_df = pd.read_excel(
-                io.BytesIO(cleaned_bytes),
-                sheet_name=summary["sheet_name"],
-                header=None,
-            ).head(10)
+        if preview_df is None:
+            # Fallback: parse only the first 10 rows of the cleaned file
+            try:
+                if fmt == "csv":
+                    preview_df = pd.read_csv(
+                        io.BytesIO(cleaned_bytes),
+                        nrows=10,
+                        encoding=_csv_encoding(cleaned_bytes),
+                        **_CSV_READ_OPTS,
+                    )
+                else:
+                    preview_df = pd.read_excel(
+                        io.BytesIO(cleaned_bytes),
+                        sheet_name=summary["sheet_name"],
+                        header=None,
+                        engine="calamine",
+                        nrows=10,
+                    )
+            except Exception:
+                st.info("Preview not available, but the file is ready for download.")
+        if preview_df is not None:
             st.dataframe(preview_df)
-        except Exception:
-            st.info("Preview not available, but the file is ready for download.")
 
 
 if __name__ == "__main__":